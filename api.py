@@ -1,35 +1,49 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+from cachetools import TTLCache, cached
 from db_manager import DatabaseManager
-from etl_runner import ETLPipeline
-from io import BytesIO
+from serpapi_client import extract_asin_from_url
+from tasks import enqueue_etl
+from itertools import chain
+import orjson
 from datetime import datetime
+import os
 import threading
-import re
 
 app = Flask(__name__)
 CORS(app)
 
-# shared DB + ETL status
+# shared DB; ETL status lives in the etl_status table so every worker agrees
 db = DatabaseManager()
-processing_status = {
-    "is_processing": False,
-    "message": "",
-    "progress": 0,
-}
 
+# the dashboard polls these on a timer; serve repeats from a short per-process TTL
+_categories_cache = TTLCache(maxsize=1, ttl=5)
+_stats_cache = TTLCache(maxsize=1, ttl=2)
 
-def extract_asin_from_url(url: str):
+# upper bound for /api/reviews?limit=
+MAX_REVIEWS_PAGE = 500
+
+
+def fast_json(data, status=200):
     """
-    Extract ASIN (10-char alphanumeric) from common Amazon URL forms.
+    jsonify replacement backed by orjson (C encoder, native datetime support)
+    for the larger / hotter payloads.
     """
-    m = re.search(r"/dp/([A-Z0-9]{10})", url)
-    if m:
-        return m.group(1)
-    m = re.search(r"/gp/product/([A-Z0-9]{10})", url)
-    if m:
-        return m.group(1)
-    return None
+    return Response(
+        orjson.dumps(data, option=orjson.OPT_NAIVE_UTC),
+        status=status,
+        mimetype="application/json",
+    )
+
+
+@cached(_categories_cache, lock=threading.Lock())
+def _load_categories():
+    return db.get_categories()
+
+
+@cached(_stats_cache, lock=threading.Lock())
+def _load_stats():
+    return db.get_processing_stats()
 
 
 @app.route("/api/health", methods=["GET"])
@@ -39,10 +53,10 @@ def health_check():
 
 @app.route("/api/status", methods=["GET"])
 def get_status():
-    stats = db.get_processing_stats()
-    return jsonify(
+    stats = _load_stats()
+    return fast_json(
         {
-            "processing": processing_status,
+            "processing": db.get_processing_status(),
             "stats": stats,
         }
     )
@@ -66,17 +80,36 @@ def add_links():
     if not product_type:
         return jsonify({"error": "No product_type provided"}), 400
 
-    added_asins = []
+    # keep only URLs we can pull an ASIN from; dedupe by URL within the batch
+    rows_by_url = {}
+    invalid_urls = []
     for url in urls:
-        asin = extract_asin_from_url(url)
-        db.insert_link(asin=asin, url=url, product_type=product_type)
-        added_asins.append(asin)
+        # same extractor the ETL uses, so every accepted link is one it can process
+        asin = extract_asin_from_url(url) if isinstance(url, str) else None
+        if asin:
+            rows_by_url[url] = (asin, url, product_type)
+        else:
+            invalid_urls.append(url)
+
+    if not rows_by_url:
+        return jsonify({"error": "No valid Amazon URLs provided", "invalid_urls": invalid_urls}), 400
+
+    rows = list(rows_by_url.values())
+    db.insert_links_bulk(rows)
+    _categories_cache.clear()
+    _stats_cache.clear()
+    added_asins = [asin for asin, _, _ in rows]
+
+    message = f"Successfully added {len(added_asins)} links under '{product_type}' category."
+    if invalid_urls:
+        message += f" Skipped {len(invalid_urls)} URL(s) without an ASIN."
 
     return (
         jsonify(
             {
-                "message": f"Successfully added {len(added_asins)} links under '{product_type}' category.",
+                "message": message,
                 "asins": added_asins,
+                "invalid_urls": invalid_urls,
             }
         ),
         201,
@@ -91,30 +124,19 @@ def process_links():
       "skip_existing": true  # default true
     }
     """
-    global processing_status
-    if processing_status["is_processing"]:
-        return jsonify({"error": "Processing already in progress"}), 409
-
     data = request.get_json(force=True) or {}
     skip_existing = data.get("skip_existing", True)
 
-    def run_pipeline():
-        global processing_status
-        processing_status["is_processing"] = True
-        processing_status["message"] = "Processing started..."
-        try:
-            pipeline = ETLPipeline()
-            pipeline.run(skip_existing=skip_existing)
-            processing_status["message"] = "Processing completed successfully"
-        except Exception as e:
-            processing_status["message"] = f"Error: {str(e)}"
-        finally:
-            processing_status["is_processing"] = False
+    if not db.try_start_processing("Processing queued..."):
+        return jsonify({"error": "Processing already in progress"}), 409
 
-    t = threading.Thread(target=run_pipeline, daemon=True)
-    t.start()
+    try:
+        task_id = enqueue_etl(skip_existing=skip_existing)
+    except Exception as e:
+        db.set_processing_status(f"Error: {str(e)}", is_processing=False)
+        return jsonify({"error": f"Could not start processing: {e}"}), 503
 
-    return jsonify({"message": "Processing started"}), 202
+    return jsonify({"message": "Processing started", "task_id": task_id}), 202
 
 
 @app.route("/api/export", methods=["GET"])
@@ -127,18 +149,60 @@ def export_reviews():
     asin = request.args.get("asin")
     product_type = request.args.get("product_type")
 
-    csv_data = db.export_reviews_to_csv(asin=asin, product_type=product_type)
-    if not csv_data:
-        return jsonify({"error": "No reviews found"}), 404
+    chunks = db.stream_reviews_csv(asin=asin, product_type=product_type)
+
+    # peek so we can still answer 404 before committing to a streamed body
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        return fast_json({"error": "No reviews found"}, status=404)
 
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"amazon_reviews_{ts}.csv"
 
-    return send_file(
-        BytesIO(csv_data.encode("utf-8")),
+    return Response(
+        stream_with_context(chain([first_chunk], chunks)),
         mimetype="text/csv",
-        as_attachment=True,
-        download_name=filename,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@app.route("/api/reviews", methods=["GET"])
+def get_reviews():
+    """
+    Optional query params:
+    - asin=...
+    - product_type=...
+    - limit=... (default 100, max 500)
+    - before=... (next_cursor from the previous page)
+    """
+    asin = request.args.get("asin")
+    product_type = request.args.get("product_type")
+
+    try:
+        limit = min(max(int(request.args.get("limit", 100)), 1), MAX_REVIEWS_PAGE)
+    except ValueError:
+        return fast_json({"error": "limit must be an integer"}, status=400)
+
+    before = None
+    if request.args.get("before"):
+        try:
+            ts, review_id = request.args["before"].rsplit("_", 1)
+            before = (datetime.fromisoformat(ts), int(review_id))
+        except ValueError:
+            return fast_json({"error": "Invalid before cursor"}, status=400)
+
+    reviews = db.get_reviews(
+        asin=asin, product_type=product_type, limit=limit, before=before
+    )
+
+    # a full page means there may be more; cursor = "<inserted_on>_<id>" of the last row
+    next_cursor = None
+    if len(reviews) == limit:
+        last = reviews[-1]
+        next_cursor = f"{last['inserted_on'].isoformat()}_{last['id']}"
+
+    return fast_json(
+        {"reviews": reviews, "count": len(reviews), "next_cursor": next_cursor}
     )
 
 
@@ -147,22 +211,12 @@ def get_categories():
     """
     Return all distinct product_type values from amazon_links.
     """
-    with db.conn.cursor() as cur:
-        cur.execute(
-            """
-            SELECT DISTINCT product_type
-            FROM amazon_links
-            WHERE product_type IS NOT NULL
-            ORDER BY product_type;
-        """
-        )
-        rows = cur.fetchall()
-
-    categories = [row["product_type"] for row in rows]
-
-    return jsonify({"categories": categories})
+    return jsonify({"categories": _load_categories()})
 
 
 if __name__ == "__main__":
-    # dev server
+    # dev server: a job flagged as running can't survive a restart of the
+    # in-process thread fallback, so clear any stale flag left behind
+    if not os.getenv("REDIS_URL"):
+        db.set_processing_status("", is_processing=False)
     app.run(debug=True, host="0.0.0.0", port=5000)
@@ -1,166 +1,475 @@
 import os
-import csv
-from io import StringIO
+import atexit
+import threading
 from dotenv import load_dotenv
-import psycopg
-from psycopg.rows import dict_row
+from psycopg import sql
+from psycopg.conninfo import make_conninfo
+from psycopg.rows import dict_row, tuple_row
+from psycopg_pool import ConnectionPool
 from loguru import logger
 
 
 class DatabaseManager:
     """
     Handles all database operations for the Amazon Reviews ETL pipeline.
-    We keep a single shared connection so the API and ETL can both reuse it.
+    All instances share one connection pool; each method leases a connection
+    only for the duration of its query, so API requests and the ETL don't
+    serialize on a single session.
+    Connections aren't autocommit: each lease is one transaction, committed
+    when the method's `with` block exits cleanly and rolled back if it raises.
     """
 
-    _shared_conn = None
+    _shared_pool = None
+    _pool_lock = threading.Lock()
 
     def __init__(self):
         # Load .env (local dev)
         load_dotenv(dotenv_path=os.path.join(os.getcwd(), ".env"))
+        self.ensure_tables_exist()
 
-        if DatabaseManager._shared_conn:
-            self.conn = DatabaseManager._shared_conn
-        else:
-            DatabaseManager._shared_conn = psycopg.connect(
-                host=os.getenv("PG_HOST"),
-                dbname=os.getenv("PG_DATABASE"),
-                user=os.getenv("PG_USER"),
-                password=os.getenv("PG_PASSWORD"),
-                port=os.getenv("PG_PORT"),
-                sslmode=os.getenv("PG_SSLMODE", "require"),
-                sslrootcert=os.getenv("PG_SSLROOTCERT", "ca.pem"),
-                row_factory=dict_row,
-            )
-            DatabaseManager._shared_conn.autocommit = True
-            self.conn = DatabaseManager._shared_conn
-            logger.success(
-                f"Connected to PostgreSQL at {os.getenv('PG_HOST')}:{os.getenv('PG_PORT')}"
-            )
+    @property
+    def _pool(self):
+        """
+        The process-wide pool, opened on first use. After a fork (Gunicorn
+        --preload) the child starts with no pool and opens its own here.
+        """
+        if DatabaseManager._shared_pool is None:
+            with DatabaseManager._pool_lock:
+                if DatabaseManager._shared_pool is None:
+                    DatabaseManager._shared_pool = self._open_pool()
+        return DatabaseManager._shared_pool
 
-        self.ensure_tables_exist()
+    @staticmethod
+    def _open_pool():
+        conninfo = make_conninfo(
+            host=os.getenv("PG_HOST"),
+            dbname=os.getenv("PG_DATABASE"),
+            user=os.getenv("PG_USER"),
+            password=os.getenv("PG_PASSWORD"),
+            port=os.getenv("PG_PORT"),
+            sslmode=os.getenv("PG_SSLMODE", "require"),
+            sslrootcert=os.getenv("PG_SSLROOTCERT", "ca.pem"),
+        )
+        pool = ConnectionPool(
+            conninfo=conninfo,
+            min_size=4,
+            max_size=25,
+            kwargs={"row_factory": dict_row},
+            # hand out only live connections; a dropped one is replaced, not shared
+            check=ConnectionPool.check_connection,
+            open=False,
+        )
+        pool.open(wait=True)
+        logger.success(
+            f"Connected to PostgreSQL at {os.getenv('PG_HOST')}:{os.getenv('PG_PORT')}"
+        )
+        return pool
+
+    @staticmethod
+    def _close_pool():
+        if DatabaseManager._shared_pool is not None:
+            DatabaseManager._shared_pool.close()
+            DatabaseManager._shared_pool = None
+
+    @staticmethod
+    def _forget_pool_after_fork():
+        # The parent's sockets and pool worker threads don't belong to the child;
+        # drop the reference (don't close — that would end the parent's sessions).
+        DatabaseManager._shared_pool = None
+        DatabaseManager._pool_lock = threading.Lock()
 
     # ---------- SCHEMA / MIGRATION ----------
+    # every table / index ensure_tables_exist creates; keep in sync with the DDL
+    _SCHEMA_OBJECTS = [
+        "amazon_links",
+        "amazon_reviews",
+        "etl_status",
+        "ux_reviews_url_text",
+        "ix_reviews_product_url",
+        "ix_reviews_inserted_on",
+        "ix_reviews_asin",
+        "ix_reviews_product_type",
+        "ix_reviews_link_id",
+        "ix_links_product_type",
+    ]
+    # arbitrary pg_advisory_xact_lock key: one process runs the schema setup at a time
+    _SCHEMA_LOCK_KEY = 7243101
+
+    @staticmethod
+    def _schema_state(cur):
+        """
+        (all tables/indexes exist, amazon_reviews.link_id exists,
+        amazon_reviews.product_type exists) from the catalogs, without
+        touching the tables themselves.
+        """
+        cur.execute(
+            """
+            SELECT
+                (SELECT bool_and(to_regclass(name) IS NOT NULL)
+                 FROM unnest(%s::text[]) AS name),
+                EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_schema = current_schema()
+                      AND table_name = 'amazon_reviews' AND column_name = 'link_id'
+                ),
+                EXISTS (
+                    SELECT 1 FROM information_schema.columns
+                    WHERE table_schema = current_schema()
+                      AND table_name = 'amazon_reviews' AND column_name = 'product_type'
+                );
+        """,
+            (DatabaseManager._SCHEMA_OBJECTS,),
+        )
+        return cur.fetchone()
+
     def ensure_tables_exist(self):
         """
         Make sure our two core tables exist and have the final columns we care about.
         - amazon_links: one row per product URL
         - amazon_reviews: many rows per product URL (snippets)
+        Runs on every DatabaseManager(), so the common case is one catalog query:
+        ALTER TABLE / CREATE INDEX lock the table even when they end up a no-op,
+        and that would queue every read behind e.g. a running CSV export.
+        When something is missing, the DDL runs under an advisory lock in
+        pipeline mode (statements sent back-to-back, acknowledged together).
+        """
+        with self._pool.connection() as conn:
+            with conn.cursor(row_factory=tuple_row) as cur:
+                if all(self._schema_state(cur)):
+                    logger.info("Verified tables.")
+                    return
+
+                cur.execute("SELECT pg_advisory_xact_lock(%s);", (self._SCHEMA_LOCK_KEY,))
+                # another process may have finished the setup while we waited
+                _, has_link_id, has_product_type = self._schema_state(cur)
+
+            with conn.pipeline(), conn.cursor() as cur:
+                self._create_schema(cur, has_link_id, has_product_type)
+
+        logger.info("Verified / created tables.")
+
+    def _create_schema(self, cur, has_link_id, has_product_type):
+        """
+        All CREATE ... IF NOT EXISTS DDL; the ALTERs and the one-off backfill
+        only run for columns the catalogs reported missing.
+        """
+        # products / URLs
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS amazon_links (
+                id SERIAL PRIMARY KEY,
+                asin TEXT,
+                url TEXT UNIQUE,
+                product_type TEXT,
+                product_name TEXT,
+                added_on TIMESTAMP DEFAULT NOW()
+            );
         """
-        with self.conn.cursor() as cur:
-            # products / URLs
+        )
+
+        # individual review snippets + product metadata snapshot
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS amazon_reviews (
+                id SERIAL PRIMARY KEY,
+                asin TEXT,
+                product_url TEXT,
+                product_name TEXT,
+                price TEXT,
+                avg_star_rating FLOAT,
+                review_title TEXT,
+                review_text TEXT,
+                rating FLOAT,
+                review_date TEXT,
+                verified BOOLEAN DEFAULT FALSE,
+                inserted_on TIMESTAMP DEFAULT NOW()
+            );
+        """
+        )
+
+        # single-row ETL job status, shared by every API / worker process
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS etl_status (
+                id INT PRIMARY KEY,
+                is_processing BOOLEAN NOT NULL DEFAULT FALSE,
+                message TEXT NOT NULL DEFAULT '',
+                progress INT NOT NULL DEFAULT 0,
+                updated_on TIMESTAMP DEFAULT NOW()
+            );
+        """
+        )
+        cur.execute("INSERT INTO etl_status (id) VALUES (1) ON CONFLICT DO NOTHING;")
+
+        # one row per (url, snippet); md5 keeps long review_text within btree limits
+        cur.execute(
+            """
+            CREATE UNIQUE INDEX IF NOT EXISTS ux_reviews_url_text
+            ON amazon_reviews (product_url, md5(review_text));
+        """
+        )
+
+        # backs the pending-links anti-join and per-URL skip checks
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_reviews_product_url
+            ON amazon_reviews (product_url);
+        """
+        )
+
+        # newest-first listing for /api/reviews, plus per-asin filtering
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_reviews_inserted_on
+            ON amazon_reviews (inserted_on DESC, id DESC);
+        """
+        )
+        # partial: serves both asin lookups and COUNT(DISTINCT asin) WHERE asin IS NOT NULL
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_reviews_asin
+            ON amazon_reviews (asin) WHERE asin IS NOT NULL;
+        """
+        )
+
+        # denormalized category + owning link on each review, so filtering
+        # by category is an index scan on amazon_reviews instead of a URL join
+        if not has_link_id:
             cur.execute(
                 """
-                CREATE TABLE IF NOT EXISTS amazon_links (
-                    id SERIAL PRIMARY KEY,
-                    asin TEXT,
-                    url TEXT UNIQUE,
-                    product_type TEXT,
-                    product_name TEXT,
-                    added_on TIMESTAMP DEFAULT NOW()
-                );
+                ALTER TABLE amazon_reviews
+                ADD COLUMN link_id INT REFERENCES amazon_links(id) ON DELETE SET NULL;
             """
             )
-
-            # individual review snippets + product metadata snapshot
+        if not has_product_type:
+            cur.execute("ALTER TABLE amazon_reviews ADD COLUMN product_type TEXT;")
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_reviews_product_type
+            ON amazon_reviews (product_type);
+        """
+        )
+        # pending-links anti-join probes this instead of comparing URL text
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_reviews_link_id
+            ON amazon_reviews (link_id);
+        """
+        )
+        # one-off backfill for rows stored before the columns existed
+        if not has_link_id:
             cur.execute(
                 """
-                CREATE TABLE IF NOT EXISTS amazon_reviews (
-                    id SERIAL PRIMARY KEY,
-                    asin TEXT,
-                    product_url TEXT,
-                    product_name TEXT,
-                    price TEXT,
-                    avg_star_rating FLOAT,
-                    review_title TEXT,
-                    review_text TEXT,
-                    rating FLOAT,
-                    review_date TEXT,
-                    verified BOOLEAN DEFAULT FALSE,
-                    inserted_on TIMESTAMP DEFAULT NOW()
-                );
+                UPDATE amazon_reviews r
+                SET product_type = l.product_type, link_id = l.id
+                FROM amazon_links l
+                WHERE r.product_url = l.url AND r.link_id IS NULL;
             """
             )
 
-        logger.info("Verified / created tables.")
+        # category dropdown (SELECT DISTINCT product_type) and category filters
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS ix_links_product_type
+            ON amazon_links (product_type);
+        """
+        )
 
     # ---------- LINK MGMT ----------
     def insert_link(self, asin, url, product_type):
         """
         Insert new product into amazon_links or update existing.
+        Thin wrapper over insert_links_bulk.
         """
-        with self.conn.cursor() as cur:
-            cur.execute(
+        self.insert_links_bulk([(asin, url, product_type)])
+
+    def insert_links_bulk(self, rows):
+        """
+        Upsert many (asin, url, product_type) tuples in one executemany.
+        """
+        if not rows:
+            return
+
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.executemany(
                 """
                 INSERT INTO amazon_links (asin, url, product_type)
                 VALUES (%s, %s, %s)
                 ON CONFLICT (url)
                 DO UPDATE SET asin = EXCLUDED.asin,
-                              product_type = EXCLUDED.product_type;
+                              product_type = EXCLUDED.product_type
+                -- re-submitted, unchanged links write no new row version / WAL
+                WHERE amazon_links.asin IS DISTINCT FROM EXCLUDED.asin
+                   OR amazon_links.product_type IS DISTINCT FROM EXCLUDED.product_type;
             """,
-                (asin, url, product_type),
+                rows,
             )
+            self._sync_review_categories(cur, [url for _, url, _ in rows])
+
+    def _sync_review_categories(self, cur, urls):
+        """
+        Push amazon_links.product_type down to the denormalized copy on
+        amazon_reviews for these URLs (no-op for rows already in sync).
+        """
+        cur.execute(
+            """
+            UPDATE amazon_reviews r
+            SET product_type = l.product_type
+            FROM amazon_links l
+            WHERE r.link_id = l.id
+              AND l.url = ANY(%s)
+              AND r.product_type IS DISTINCT FROM l.product_type;
+        """,
+            (urls,),
+        )
 
     def get_all_links(self):
         """
         Return all product links we know about.
         """
-        with self.conn.cursor() as cur:
+        with self._pool.connection() as conn, conn.cursor() as cur:
             cur.execute("SELECT * FROM amazon_links ORDER BY id;")
             return cur.fetchall()
 
-    def update_product_metadata_for_url(self, url, product_name, price, avg_star_rating):
+    def get_reviewed_urls(self):
         """
-        Store product_name in amazon_links for display/export downstream.
-        (Price and avg_star_rating we repeat per review row instead of here,
-        because they can fluctuate over time.)
+        Set of product URLs that already have at least one review row.
+        """
+        # single column, potentially many rows: skip the per-row dict
+        with self._pool.connection() as conn, conn.cursor(row_factory=tuple_row) as cur:
+            cur.execute("SELECT DISTINCT product_url FROM amazon_reviews;")
+            return {row[0] for row in cur}
+
+    def get_categories(self):
+        """
+        All distinct product_type values from amazon_links.
         """
-        with self.conn.cursor() as cur:
+        with self._pool.connection() as conn, conn.cursor(row_factory=tuple_row) as cur:
             cur.execute(
                 """
+                SELECT DISTINCT product_type
+                FROM amazon_links
+                WHERE product_type IS NOT NULL
+                ORDER BY product_type;
+            """
+            )
+            return [row[0] for row in cur]
+
+    def update_product_metadata_bulk(self, rows):
+        """
+        Store product_name for many (url, product_name) pairs with a single
+        UPDATE ... FROM (VALUES ...) statement.
+        """
+        if not rows:
+            return
+
+        values = sql.SQL(", ").join([sql.SQL("(%s, %s)")] * len(rows))
+        params = [value for row in rows for value in row]
+
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                sql.SQL(
+                    """
                 UPDATE amazon_links
-                SET product_name = %s
-                WHERE url = %s;
-            """,
-                (product_name, url),
+                SET product_name = v.product_name
+                FROM (VALUES {}) AS v(url, product_name)
+                WHERE amazon_links.url = v.url;
+            """
+                ).format(values),
+                params,
             )
-        logger.info(f"Updated product name for {url}")
+        logger.info(f"Updated product names for {len(rows)} links")
+
+    def update_product_metadata_for_url(self, url, product_name, price, avg_star_rating):
+        """
+        Store product_name in amazon_links for display/export downstream.
+        (Price and avg_star_rating we repeat per review row instead of here,
+        because they can fluctuate over time.)
+        """
+        self.update_product_metadata_bulk([(url, product_name)])
 
         # we don't store price / avg in amazon_links for now,
         # we snapshot them with each review row
 
     # ---------- REVIEW INSERTION ----------
-    def insert_review_row(
-        self,
-        asin,
-        product_url,
-        product_name,
-        price,
-        avg_star_rating,
-        review_title,
-        review_text,
-        rating,
-        review_date,
-        verified=False,
-    ):
-        """
-        Insert one review row into amazon_reviews unless it's already present.
-        Identity check = same product_url + same review_text.
-        """
-        if not product_url or not review_text:
+    def insert_review_rows(self, rows):
+        """
+        Insert a batch of review dicts into amazon_reviews.
+        Rows without product_url / review_text are dropped; duplicates of an
+        already stored (product_url, review_text) are skipped by the unique index.
+        All rows go out in one binary COPY instead of a SELECT + INSERT
+        round-trip per review.
+        """
+        params = [
+            (
+                r.get("asin"),
+                r.get("product_url"),
+                r.get("product_name"),
+                r.get("price"),
+                r.get("avg_star_rating"),
+                r.get("review_title"),
+                r.get("review_text"),
+                r.get("rating"),
+                r.get("review_date"),
+                r.get("verified", False),
+                r.get("product_type"),
+                r.get("link_id"),
+            )
+            for r in rows
+            if r.get("product_url") and r.get("review_text")
+        ]
+        if not params:
             return
 
-        with self.conn.cursor() as cur:
-            # dedupe
+        # COPY the batch into a per-session temp table (no WAL, no cross-connection
+        # races), then let the unique index drop duplicates on the way into
+        # amazon_reviews. ON COMMIT DELETE ROWS empties the stage for the next batch.
+        with self._pool.connection() as conn, conn.cursor() as cur:
             cur.execute(
                 """
-                SELECT 1 FROM amazon_reviews
-                WHERE product_url = %s AND review_text = %s;
-            """,
-                (product_url, review_text),
+                CREATE TEMP TABLE IF NOT EXISTS amazon_reviews_stage (
+                    asin TEXT,
+                    product_url TEXT,
+                    product_name TEXT,
+                    price TEXT,
+                    avg_star_rating FLOAT,
+                    review_title TEXT,
+                    review_text TEXT,
+                    rating FLOAT,
+                    review_date TEXT,
+                    verified BOOLEAN,
+                    product_type TEXT,
+                    link_id INT
+                ) ON COMMIT DELETE ROWS;
+            """
             )
-            if cur.fetchone():
-                return  # already stored
+
+            with cur.copy(
+                """
+                COPY amazon_reviews_stage (
+                    asin,
+                    product_url,
+                    product_name,
+                    price,
+                    avg_star_rating,
+                    review_title,
+                    review_text,
+                    rating,
+                    review_date,
+                    verified,
+                    product_type,
+                    link_id
+                ) FROM STDIN (FORMAT BINARY)
+            """
+            ) as copy:
+                copy.set_types(
+                    [
+                        "text", "text", "text", "text", "float8", "text",
+                        "text", "float8", "text", "bool", "text", "int4",
+                    ]
+                )
+                for row in params:
+                    copy.write_row(row)
 
             cur.execute(
                 """
@@ -174,10 +483,11 @@ class DatabaseManager:
                     review_text,
                     rating,
                     review_date,
-                    verified
-                ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s);
-            """,
-                (
+                    verified,
+                    product_type,
+                    link_id
+                )
+                SELECT
                     asin,
                     product_url,
                     product_name,
@@ -188,53 +498,130 @@ class DatabaseManager:
                     rating,
                     review_date,
                     verified,
-                ),
+                    product_type,
+                    link_id
+                FROM amazon_reviews_stage
+                ON CONFLICT (product_url, md5(review_text)) DO NOTHING;
+            """,
+                # runs once per link on every pooled connection: parse/plan it once
+                prepare=True,
             )
 
+    def insert_review_row(self, **review):
+        """
+        Insert one review row. Thin wrapper over insert_review_rows; the ETL
+        batches a whole product's reviews into a single call instead.
+        """
+        self.insert_review_rows([review])
+
     # ---------- DASHBOARD STATS ----------
     def get_processing_stats(self):
         """
-        Dashboard summary numbers.
+        Dashboard summary numbers, fetched in a single round-trip.
+        - total_links: every product link
+        - processed_asins: unique asins with at least one review row
+        - pending_asins: links with zero reviews
+        - total_reviews: every review row
         """
-        with self.conn.cursor() as cur:
-            # total links
-            cur.execute("SELECT COUNT(*) AS total_links FROM amazon_links;")
-            total_links = cur.fetchone()["total_links"]
-
-            # how many unique asins actually have at least one review row
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            # one pass over each table: links (total + pending) and reviews
+            # (total + distinct asins; COUNT(DISTINCT) already skips NULLs)
             cur.execute(
                 """
-                SELECT COUNT(DISTINCT asin) AS processed_asins
-                FROM amazon_reviews
-                WHERE asin IS NOT NULL;
+                SELECT
+                    l.total_links,
+                    r.processed_asins,
+                    l.pending_asins,
+                    r.total_reviews
+                FROM (
+                    SELECT
+                        COUNT(*) AS total_links,
+                        -- same rule as the ETL's get_reviewed_urls (by URL); rows
+                        -- without link_id (pre-backfill, link re-added, callers
+                        -- not passing it) are matched on product_url instead
+                        COUNT(*) FILTER (
+                            WHERE NOT EXISTS (
+                                SELECT 1
+                                FROM amazon_reviews ar
+                                WHERE ar.link_id = al.id
+                            )
+                            AND NOT EXISTS (
+                                SELECT 1
+                                FROM amazon_reviews ar
+                                WHERE ar.link_id IS NULL AND ar.product_url = al.url
+                            )
+                        ) AS pending_asins
+                    FROM amazon_links al
+                ) l
+                CROSS JOIN (
+                    SELECT
+                        COUNT(*) AS total_reviews,
+                        COUNT(DISTINCT asin) AS processed_asins
+                    FROM amazon_reviews
+                ) r;
             """
             )
-            processed_asins = cur.fetchone()["processed_asins"]
+            return dict(cur.fetchone())
+
+    # ---------- ETL JOB STATUS ----------
+    def get_processing_status(self):
+        """
+        Current ETL job status as shown on the dashboard.
+        """
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT is_processing, message, progress FROM etl_status WHERE id = 1;"
+            )
+            return cur.fetchone()
+
+    # a running job touches updated_on after every link; a flag older than this
+    # belongs to a job that died without clearing it (killed worker, crash)
+    STALE_PROCESSING_AFTER = "15 minutes"
 
-            # links with zero reviews
+    def try_start_processing(self, message):
+        """
+        Atomically flag the ETL job as running.
+        Returns False if another live request / worker already holds the flag;
+        a stale flag is taken over.
+        """
+        with self._pool.connection() as conn, conn.cursor(row_factory=tuple_row) as cur:
             cur.execute(
                 """
-                SELECT COUNT(*) AS pending_asins
-                FROM amazon_links l
-                WHERE NOT EXISTS (
-                    SELECT 1
-                    FROM amazon_reviews r
-                    WHERE r.product_url = l.url
-                );
-            """
+                UPDATE etl_status
+                SET is_processing = TRUE, message = %s, progress = 0, updated_on = NOW()
+                WHERE id = 1
+                  AND (NOT is_processing OR updated_on < NOW() - %s::interval)
+                RETURNING id;
+            """,
+                (message, self.STALE_PROCESSING_AFTER),
             )
-            pending_asins = cur.fetchone()["pending_asins"]
+            return cur.fetchone() is not None
 
-            # total number of review rows
-            cur.execute("SELECT COUNT(*) AS total_reviews FROM amazon_reviews;")
-            total_reviews = cur.fetchone()["total_reviews"]
+    def update_processing_progress(self, progress):
+        """
+        Heartbeat from a running job: store percent done and refresh updated_on
+        so the flag isn't considered stale.
+        """
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE etl_status
+                SET progress = %s, updated_on = NOW()
+                WHERE id = 1 AND is_processing;
+            """,
+                (progress,),
+            )
 
-        return {
-            "total_links": total_links,
-            "processed_asins": processed_asins,
-            "pending_asins": pending_asins,
-            "total_reviews": total_reviews,
-        }
+    def set_processing_status(self, message, is_processing=True):
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(
+                """
+                UPDATE etl_status
+                SET is_processing = %s, message = %s, updated_on = NOW()
+                WHERE id = 1;
+            """,
+                (is_processing, message),
+            )
 
     # ---------- MAINTENANCE ----------
     def clear_all_reviews(self):
@@ -242,59 +629,123 @@ class DatabaseManager:
         Danger zone: wipe all review rows.
         We call this if skip_existing=False to "full refresh".
         """
-        with self.conn.cursor() as cur:
+        with self._pool.connection() as conn, conn.cursor() as cur:
             cur.execute("DELETE FROM amazon_reviews;")
         logger.warning("Cleared all records from amazon_reviews.")
 
-    # ---------- EXPORT ----------
-    def export_reviews_to_csv(self, asin=None, product_type=None):
+    # ---------- REVIEW LISTING ----------
+    def get_reviews(self, asin=None, product_type=None, limit=100, before=None):
         """
-        Dump the review rows as CSV.
-        We can support filtering by asin/product_type later.
+        Newest review rows as dicts, optionally filtered by asin / product_type.
+        `before` is an (inserted_on, id) keyset cursor: only rows strictly older
+        than it are returned, so deep pages cost the same as the first one.
         """
-        with self.conn.cursor() as cur:
-            base_query = """
-                SELECT
-                    asin,
-                    product_url,
-                    product_name,
-                    price,
-                    avg_star_rating,
-                    review_title,
-                    review_text,
-                    rating,
-                    review_date,
-                    verified,
-                    inserted_on
-                FROM amazon_reviews
+        query = sql.SQL(
             """
+            SELECT
+                r.id,
+                r.asin,
+                r.product_url,
+                r.product_name,
+                r.price,
+                r.avg_star_rating,
+                r.review_title,
+                r.review_text,
+                r.rating,
+                r.review_date,
+                r.verified,
+                r.inserted_on
+            FROM amazon_reviews r
+        """
+        )
 
-            filters = []
-            params = []
+        conditions = []
+        params = []
 
-            if asin:
-                filters.append("asin = %s")
-                params.append(asin)
+        if asin:
+            conditions.append(sql.SQL("r.asin = %s"))
+            params.append(asin)
 
-            if product_type:
-                # join to links to filter by category
-                base_query += " JOIN amazon_links al ON amazon_reviews.product_url = al.url "
-                filters.append("al.product_type = %s")
-                params.append(product_type)
+        if product_type:
+            conditions.append(sql.SQL("r.product_type = %s"))
+            params.append(product_type)
 
-            if filters:
-                base_query += " WHERE " + " AND ".join(filters)
+        if before:
+            conditions.append(sql.SQL("(r.inserted_on, r.id) < (%s, %s)"))
+            params.extend(before)
 
-            base_query += " ORDER BY inserted_on DESC;"
+        if conditions:
+            query += sql.SQL(" WHERE ") + sql.SQL(" AND ").join(conditions)
 
-            cur.execute(base_query, params)
-            rows = cur.fetchall()
+        query += sql.SQL(" ORDER BY r.inserted_on DESC, r.id DESC LIMIT %s;")
+        params.append(limit)
+
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            cur.execute(query, params)
+            return cur.fetchall()
+
+    # ---------- EXPORT ----------
+    def stream_reviews_csv(self, asin=None, product_type=None, chunk_size=64 * 1024):
+        """
+        Stream the review rows as UTF-8 CSV bytes, serialized server-side by
+        COPY ... TO STDOUT so rows never become Python objects.
+        Chunks are coalesced to ~chunk_size bytes; the header is only emitted
+        once the first row arrives, so an empty result yields nothing.
+        """
+        columns = [
+            "asin",
+            "product_url",
+            "product_name",
+            "price",
+            "avg_star_rating",
+            "review_title",
+            "review_text",
+            "rating",
+            "review_date",
+            "verified",
+            "inserted_on",
+        ]
+        base_query = f"""
+            SELECT {", ".join(columns)}
+            FROM amazon_reviews
+        """
+
+        filters = []
+        params = []
+
+        if asin:
+            filters.append("asin = %s")
+            params.append(asin)
+
+        if product_type:
+            filters.append("product_type = %s")
+            params.append(product_type)
+
+        if filters:
+            base_query += " WHERE " + " AND ".join(filters)
+
+        base_query += " ORDER BY inserted_on DESC"
+
+        buf = bytearray()
+        header = (",".join(columns) + "\n").encode("utf-8")
+
+        with self._pool.connection() as conn, conn.cursor() as cur:
+            # COPY can't take server-side parameters; psycopg binds these client-side
+            with cur.copy(f"COPY ({base_query}) TO STDOUT WITH (FORMAT CSV)", params) as copy:
+                for data in copy:
+                    if header:
+                        buf += header
+                        header = None
+                    buf += data
+
+                    if len(buf) >= chunk_size:
+                        yield bytes(buf)
+                        buf.clear()
+
+        if buf:
+            yield bytes(buf)
 
-        if not rows:
-            return None
 
-        output = StringIO()
-        writer = csv.DictWriter(output, fieldnames=rows[0].keys())
-        writer.writeheader()
-        writer.writerows(rows)
-        return output.getvalue()
+atexit.register(DatabaseManager._close_pool)
+if hasattr(os, "register_at_fork"):  # not available on Windows
+    os.register_at_fork(after_in_child=DatabaseManager._forget_pool_after_fork)
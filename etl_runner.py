@@ -1,4 +1,6 @@
+import os
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from loguru import logger
 from db_manager import DatabaseManager
 from serpapi_client import SerpAPIClient
@@ -8,99 +10,152 @@ class ETLPipeline:
     """
     Orchestrates:
     1. load all product links from DB
-    2. for each link:
+    2. for each link (fetched concurrently on a small thread pool):
        - get product metadata (price, avg stars, etc.)
        - get review snippets
-       - insert rows into amazon_reviews
+    3. as each link's fetch finishes, insert its rows into amazon_reviews
+       (DB writes stay on the calling thread, one batch per link)
     """
 
-    def __init__(self):
+    # product names are written to amazon_links in batches of this many links
+    METADATA_BATCH_SIZE = 50
+
+    def __init__(self, concurrency=None):
         self.db = DatabaseManager()
         self.client = SerpAPIClient()
+        # keep this within the SerpAPI plan's concurrent-search limit
+        self.concurrency = concurrency or int(os.getenv("ETL_CONCURRENCY", "4"))
+
+    def _fetch_link(self, url):
+        """
+        Network half of one link: product page metadata + review snippets.
+        Runs on a worker thread, so it must not touch shared pipeline state.
+        """
+        meta = self.client.get_product_metadata(url)
+        logger.debug("Parsed metadata for {}: {}", url, meta)
+
+        # pacing is handled by the client's rate limiters, not a fixed sleep here
+        review_snippets = self.client.get_reviews(url)
+        return meta, review_snippets
+
+    def _report_progress(self, done, total):
+        """
+        Percent done into etl_status; doubles as the running job's heartbeat.
+        """
+        try:
+            self.db.update_processing_progress(int(done * 100 / total))
+        except Exception as e:
+            logger.warning("Could not update ETL progress: {}", e)
 
     def run(self, skip_existing=True):
+        try:
+            return self._run(skip_existing)
+        finally:
+            # flush / release the on-disk metadata cache even if the run failed
+            self.client.close()
+
+    def _run(self, skip_existing):
         links = self.db.get_all_links()
         total = len(links)
-        logger.info(f"Found {total} total product links.")
+        logger.info("Found {} total product links.", total)
 
         if not skip_existing:
             logger.warning("Reprocessing all — clearing amazon_reviews table.")
             self.db.clear_all_reviews()
+            self.client.forget_empty()
             time.sleep(1)
+            reviewed_urls = set()
+        else:
+            # one query up front instead of a lookup per link
+            reviewed_urls = self.db.get_reviewed_urls()
 
         processed = 0
         skipped = 0
         errors = 0
+        pending_names = []  # (url, product_name) awaiting a bulk UPDATE
 
+        # if skipping and we already stored reviews for this URL, skip
+        todo = []
         for link in links:
-            url = link["url"]
-            asin = link["asin"]
-
-            try:
-                # if skipping and we already stored reviews for this URL, skip
-                if skip_existing:
-                    # already have at least one review row for this URL?
-                    with self.db.conn.cursor() as cur:
-                        cur.execute(
-                            "SELECT 1 FROM amazon_reviews WHERE product_url = %s LIMIT 1;",
-                            (url,),
-                        )
-                        if cur.fetchone():
-                            logger.info(f"Skipping {url} (already have reviews).")
-                            skipped += 1
-                            continue
-
-                # --- METADATA ---
-                meta = self.client.get_product_metadata(url)
-                product_name = meta.get("title")
-                price = meta.get("price")
-                avg_star_rating = meta.get("avg_rating")
-
-                # store product_name for display in /api/status, etc.
-                if product_name:
-                    self.db.update_product_metadata_for_url(
-                        url,
-                        product_name=product_name,
-                        price=price,
-                        avg_star_rating=avg_star_rating,
+            if link["url"] in reviewed_urls:
+                logger.debug("Skipping {} (already have reviews).", link["url"])
+                skipped += 1
+            else:
+                todo.append(link)
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {
+                executor.submit(self._fetch_link, link["url"]): link for link in todo
+            }
+
+            for future in as_completed(futures):
+                link = futures[future]
+                url = link["url"]
+
+                try:
+                    meta, review_snippets = future.result()
+
+                    # --- METADATA ---
+                    product_name = meta.title
+                    price = meta.price
+                    avg_star_rating = meta.avg_rating
+
+                    # store product_name for display in /api/status, etc.
+                    if product_name:
+                        pending_names.append((url, product_name))
+                        if len(pending_names) >= self.METADATA_BATCH_SIZE:
+                            self.db.update_product_metadata_bulk(pending_names)
+                            pending_names = []
+
+                    # --- REVIEWS ---
+                    if not review_snippets:
+                        logger.warning("No reviews found for {}", url)
+                        continue
+
+                    self.db.insert_review_rows(
+                        [
+                            {
+                                "asin": link["asin"],
+                                "product_url": url,
+                                "product_name": product_name,
+                                "price": price,
+                                "avg_star_rating": avg_star_rating,
+                                "review_title": r.review_title,
+                                "review_text": r.review_text,
+                                "rating": r.rating,
+                                "review_date": r.review_date,
+                                "verified": r.verified,
+                                "product_type": link["product_type"],
+                                "link_id": link["id"],
+                            }
+                            for r in review_snippets
+                        ]
                     )
 
-                logger.info(f"Metadata for {url}: {meta}")
-
-                # --- REVIEWS ---
-                review_snippets = self.client.get_reviews(url)
-                if not review_snippets:
-                    logger.warning(f"No reviews found for {url}")
-                    continue
-
-                for r in review_snippets:
-                    self.db.insert_review_row(
-                        asin=asin,
-                        product_url=url,
-                        product_name=product_name,
-                        price=price,
-                        avg_star_rating=avg_star_rating,
-                        review_title=r.get("review_title"),
-                        review_text=r.get("review_text"),
-                        rating=r.get("rating"),
-                        review_date=r.get("review_date"),
-                        verified=r.get("verified", False),
+                    processed += 1
+                    logger.success(
+                        "Processed {}: inserted {} review rows", url, len(review_snippets)
                     )
 
-                processed += 1
-                logger.success(
-                    f"Processed {url}: inserted {len(review_snippets)} review rows"
-                )
-                time.sleep(1.5)
+                except Exception as e:
+                    errors += 1
+                    logger.error("Error processing {}: {}", url, e)
+
+                finally:
+                    done += 1
+                    self._report_progress(done, len(todo))
 
+        if pending_names:
+            try:
+                self.db.update_product_metadata_bulk(pending_names)
             except Exception as e:
-                errors += 1
-                logger.error(f"Error processing {url}: {e}")
+                logger.error("Error storing product names: {}", e)
 
         logger.info("========== ETL SUMMARY ==========")
-        logger.info(f"Processed: {processed}")
-        logger.info(f"Skipped:   {skipped}")
-        logger.info(f"Errors:    {errors}")
+        logger.info("Processed: {}", processed)
+        logger.info("Skipped:   {}", skipped)
+        logger.info("Errors:    {}", errors)
         logger.info("=================================")
 
         return {"processed": processed, "skipped": skipped, "errors": errors}
@@ -1,5 +1,12 @@
+import os
+import sys
+from loguru import logger
 from etl_runner import ETLPipeline
 
 if __name__ == "__main__":
+    # batch run: per-link chatter is DEBUG; enqueue moves log I/O to loguru's writer thread
+    logger.remove()
+    logger.add(sys.stderr, level=os.getenv("ETL_LOG_LEVEL", "INFO"), enqueue=True)
+
     pipeline = ETLPipeline()
     pipeline.run()
@@ -1,9 +1,10 @@
 import os
-import json
+import orjson
 import hmac
 import hashlib
-import datetime
+import time
 import requests
+from requests.adapters import HTTPAdapter
 
 class PAAPIClient:
     def __init__(self):
@@ -12,6 +13,27 @@ class PAAPIClient:
         self.assoc_tag = os.getenv("PAAPI_ASSOC_TAG")
         self.host = "webservices.amazon.com"
         self.region = "us-east-1"
+        # keep-alive session so consecutive calls reuse the TLS connection
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+        # SigV4 signing keys only change per UTC day: (datestamp, region, service) -> key
+        self._signing_keys = {}
+
+    def _get_signing_key(self, datestamp, service):
+        cache_key = (datestamp, self.region, service)
+        k_signing = self._signing_keys.get(cache_key)
+        if k_signing is None:
+            def sign(key, msg):
+                # one-shot C fast path, no HMAC object per step
+                return hmac.digest(key, msg.encode("utf-8"), "sha256")
+
+            k_date = sign(("AWS4" + self.secret_key).encode("utf-8"), datestamp)
+            k_region = sign(k_date, self.region)
+            k_service = sign(k_region, service)
+            k_signing = sign(k_service, "aws4_request")
+            # keep only the current day's key
+            self._signing_keys = {cache_key: k_signing}
+        return k_signing
 
     def sign_request(self, payload):
         method = "POST"
@@ -19,14 +41,17 @@ class PAAPIClient:
         endpoint = f"https://{self.host}/paapi5/getitems"
         content_type = "application/json; charset=UTF-8"
 
-        t = datetime.datetime.utcnow()
-        amz_date = t.strftime("%Y%m%dT%H%M%SZ")
-        datestamp = t.strftime("%Y%m%d")
+        # plain int formatting; strftime goes through the locale machinery
+        t = time.gmtime()
+        datestamp = f"{t.tm_year:04d}{t.tm_mon:02d}{t.tm_mday:02d}"
+        amz_date = f"{datestamp}T{t.tm_hour:02d}{t.tm_min:02d}{t.tm_sec:02d}Z"
 
         canonical_uri = "/paapi5/getitems"
         canonical_headers = f"content-type:{content_type}\nhost:{self.host}\nx-amz-date:{amz_date}\n"
         signed_headers = "content-type;host;x-amz-date"
-        payload_hash = hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+        # the signed hash must cover the exact bytes we send
+        body = orjson.dumps(payload)
+        payload_hash = hashlib.sha256(body).hexdigest()
         canonical_request = "\n".join([method, canonical_uri, "", canonical_headers, signed_headers, payload_hash])
 
         algorithm = "AWS4-HMAC-SHA256"
@@ -36,14 +61,8 @@ class PAAPIClient:
             hashlib.sha256(canonical_request.encode("utf-8")).hexdigest()
         ])
 
-        def sign(key, msg):
-            return hmac.new(key, msg.encode("utf-8"), hashlib.sha256).digest()
-
-        k_date = sign(("AWS4" + self.secret_key).encode("utf-8"), datestamp)
-        k_region = sign(k_date, self.region)
-        k_service = sign(k_region, service)
-        k_signing = sign(k_service, "aws4_request")
-        signature = hmac.new(k_signing, string_to_sign.encode("utf-8"), hashlib.sha256).hexdigest()
+        k_signing = self._get_signing_key(datestamp, service)
+        signature = hmac.digest(k_signing, string_to_sign.encode("utf-8"), "sha256").hex()
 
         authorization_header = (
             f"{algorithm} Credential={self.access_key}/{credential_scope}, "
@@ -56,11 +75,28 @@ class PAAPIClient:
             "Authorization": authorization_header
         }
 
-        return endpoint, headers
+        return endpoint, headers, body
 
-    def get_product_info(self, asin):
+    # GetItems accepts at most this many ItemIds per request
+    MAX_ITEMS_PER_REQUEST = 10
+
+    def get_product_info_batch(self, asins):
+        """
+        Fetch any number of ASINs, 10 per signed GetItems request.
+        Returns {asin: {...}}; ASINs PA-API didn't return are left out.
+        """
+        asins = list(asins)
+        results = {}
+        for i in range(0, len(asins), self.MAX_ITEMS_PER_REQUEST):
+            results.update(self._get_items(asins[i:i + self.MAX_ITEMS_PER_REQUEST]))
+        return results
+
+    def _get_items(self, asins):
+        """
+        One signed GetItems request for at most MAX_ITEMS_PER_REQUEST ASINs.
+        """
         payload = {
-            "ItemIds": [asin],
+            "ItemIds": asins,
             "Resources": [
                 "ItemInfo.Title",
                 "Offers.Listings.Price",
@@ -72,17 +108,28 @@ class PAAPIClient:
             "Marketplace": "www.amazon.com"
         }
 
-        endpoint, headers = self.sign_request(payload)
-        response = requests.post(endpoint, headers=headers, json=payload)
+        endpoint, headers, body = self.sign_request(payload)
+        response = self._session.post(endpoint, headers=headers, data=body)
         try:
-            item = response.json().get("ItemsResult", {}).get("Items", [])[0]
-            return {
-                "asin": asin,
-                "title": item.get("ItemInfo", {}).get("Title", {}).get("DisplayValue"),
-                "price": item.get("Offers", {}).get("Listings", [{}])[0].get("Price", {}).get("DisplayAmount"),
-                "review_count": item.get("CustomerReviews", {}).get("Count"),
-                "star_rating": item.get("CustomerReviews", {}).get("StarRating")
-            }
+            items = response.json().get("ItemsResult", {}).get("Items", [])
         except Exception as e:
-            print(f"PA-API error for {asin}: {e}")
+            print(f"PA-API error for {asins}: {e}")
             return {}
+
+        results = {}
+        for item in items:
+            asin = item.get("ASIN")
+            try:
+                results[asin] = {
+                    "asin": asin,
+                    "title": item.get("ItemInfo", {}).get("Title", {}).get("DisplayValue"),
+                    "price": item.get("Offers", {}).get("Listings", [{}])[0].get("Price", {}).get("DisplayAmount"),
+                    "review_count": item.get("CustomerReviews", {}).get("Count"),
+                    "star_rating": item.get("CustomerReviews", {}).get("StarRating")
+                }
+            except Exception as e:
+                print(f"PA-API error for {asin}: {e}")
+        return results
+
+    def get_product_info(self, asin):
+        return self.get_product_info_batch([asin]).get(asin, {})
@@ -1,59 +1,477 @@
 import os
+import re
 import time
+import random
+import shelve
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Optional
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+from loguru import logger
+from lxml import etree, html as lxml_html
 from serpapi import GoogleSearch
 
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+# one scan for /dp/<ASIN>, /gp/product/<ASIN> and /product/<ASIN>
+# (must end the path segment, so an 11+ char id isn't silently truncated)
+_ASIN_RE = re.compile(r"/(?:dp|gp/product|product)/([A-Z0-9]{10})(?:[/?#]|$)")
+# "5 star", "5 stars", "5-star" (first mention wins)
+_STAR_RE = re.compile(r"\b(?P<n>[1-5])[ -]stars?\b", re.IGNORECASE)
+# "1,234 ratings" -> "1,234"
+_COUNT_RE = re.compile(r"\d[\d,]*")
+
+# static browser headers, built once and applied to the session; per-request
+# calls only pass their delta (e.g. conditional If-None-Match)
+_DEFAULT_HEADERS = MappingProxyType(
+    {
+        "User-Agent": (
+            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+            "AppleWebKit/537.36 (KHTML, like Gecko) "
+            "Chrome/120.0.0.0 Safari/537.36"
+        ),
+        "Accept-Language": "en-US,en;q=0.9",
+        # "gzip,deflate" plus "br" when the brotli package is installed,
+        # so we never advertise an encoding urllib3 can't decode
+        "Accept-Encoding": ACCEPT_ENCODING,
+        "Connection": "keep-alive",
+    }
+)
+
+# transient HTTP statuses worth retrying
+_RETRY_STATUSES = {429, 500, 502, 503, 504}
+# longest a worker thread sleeps between attempts, whatever Retry-After asks for
+_MAX_RETRY_DELAY = 30.0
+
+# asin -> time.monotonic() of a search that found no snippets, so known-empty
+# products don't spend SerpAPI quota again for an hour. Shared by every client in
+# the process: back-to-back runs on the API's thread fallback or an rq
+# SimpleWorker; the default forking `rq worker` starts each job with it empty
+_EMPTY_RESULTS_TTL = 3600
+_empty_asins = {}
+# SerpAPI's error text when Google simply has no results for the query
+_NO_RESULTS_ERROR = "hasn't returned any results"
+
+
+@lru_cache(maxsize=1024)
+def extract_asin_from_url(url):
+    """
+    ASIN from an Amazon product URL, or None. Memoized per process since the
+    same URL is seen on every run / retry. api.py validates submitted links
+    with this too, so anything accepted there is something the ETL can process.
+    """
+    m = _ASIN_RE.search(url)
+    return m.group(1) if m else None
+
+
+def _has_class(name):
+    # XPath equivalent of the CSS ".name" class match
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def _text(node):
+    return node.text_content().strip() if node is not None else None
+
+
+def _product_field(node):
+    """
+    Which metadata field a node matched by SerpAPIClient._XP_FIELDS is for.
+    """
+    node_id = node.get("id")
+    if node_id == "productTitle":
+        return "title"
+    if node_id == "acrCustomerReviewText":
+        return "total_reviews"
+    if node.tag == "span" and (
+        node.get("data-hook") == "rating-out-of-text"
+        or any(a.get("data-hook") == "average-star-rating" for a in node.iterancestors("i"))
+    ):
+        return "avg_rating"
+    return "price"
+
+
+def _lock_file(path):
+    """
+    Non-blocking exclusive lock on `path` (created if missing). Returns the open
+    fd holding the lock (closing it releases the lock), or None if another
+    process already holds it.
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        os.close(fd)
+        return None
+    return fd
+
+
+def _backoff_delay(attempt, base=1.0, cap=_MAX_RETRY_DELAY, jitter=0.5):
+    """
+    Exponential backoff with jitter, so parallel workers don't retry in lockstep.
+    """
+    return min(cap, base * 2 ** attempt) * (1 + random.uniform(0, jitter))
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: refills `rate` tokens per second up to `capacity`.
+    consume() only sleeps when the budget is actually exhausted, instead of a
+    fixed delay after every request.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# ---------- RESULT TYPES ----------
+# explicit __slots__ (dataclass(slots=True) needs 3.10): no per-instance __dict__
+@dataclass
+class ProductMetadata:
+    __slots__ = ("title", "price", "avg_rating", "total_reviews")
+    title: Optional[str]
+    price: Optional[str]
+    avg_rating: Optional[float]
+    total_reviews: Optional[int]
+
+    @classmethod
+    def empty(cls):
+        return cls(None, None, None, None)
+
+
+@dataclass
+class ReviewSnippet:
+    __slots__ = ("review_title", "review_text", "rating", "review_date", "verified")
+    review_title: Optional[str]
+    review_text: str
+    rating: Optional[int]        # individual review rating (may be None)
+    review_date: Optional[str]   # we can't reliably scrape this via SerpAPI Google
+    verified: bool               # also unknown here
+
+
+class _LRUMemo:
+    """
+    Small thread-safe LRU map for per-run memoization (bounded, so long runs
+    don't grow without limit).
+    """
+
+    _MISSING = object()
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            value = self._data.get(key, self._MISSING)
+            if value is self._MISSING:
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
 
 class SerpAPIClient:
+    # every product page field in one document-order traversal (instead of one
+    # per field); cheap id/tag tests come first so ancestor:: is rarely walked.
+    # CSS equivalents, first match per field wins:
+    #   title:         #productTitle
+    #   price:         .a-price .a-offscreen, span.a-color-price
+    #   avg_rating:    i[data-hook='average-star-rating'] span,
+    #                  span[data-hook='rating-out-of-text']
+    #   total_reviews: #acrCustomerReviewText
+    _XP_FIELDS = etree.XPath(
+        '//*[@id="productTitle" or @id="acrCustomerReviewText"'
+        ' or (self::span and @data-hook="rating-out-of-text")'
+        f" or (self::span and {_has_class('a-color-price')})"
+        f" or ({_has_class('a-offscreen')} and ancestor::*[{_has_class('a-price')}])"
+        ' or (self::span and ancestor::i[@data-hook="average-star-rating"])]'
+    )
+
     def __init__(self):
         self.api_key = os.getenv("SERPAPI_KEY")
 
+        # keep-alive session: repeat fetches from amazon.com reuse the TLS connection
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(_DEFAULT_HEADERS)
+
+        # polite pacing for Amazon product pages, shared by all ETL worker threads
+        self._page_bucket = TokenBucket(rate=1.0, capacity=2)
+        # SerpAPI free tier: ~1 search/s, small bursts allowed
+        self._search_bucket = TokenBucket(rate=1.0, capacity=3)
+
+        # url -> (etag, last_modified, parsed metadata), persisted across runs so
+        # unchanged pages come back as a bodiless 304. Opened on first use and
+        # closed by close() at the end of each run; shelve isn't thread-safe
+        self._etag_cache_path = os.getenv(
+            "META_CACHE_PATH",
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), "meta_cache.db"),
+        )
+        self._etag_cache = None
+        self._etag_cache_fd = None  # holds the cross-process lock while open
+        self._etag_cache_disabled = False
+        self._etag_lock = threading.Lock()
+
+        # in-memory results for this client's lifetime (one ETL run): metadata by
+        # URL, review snippets by ASIN so different URL forms share an entry
+        self._meta_memo = _LRUMemo()
+        self._reviews_memo = _LRUMemo()
+
+        # asin -> Future of a search already running on another worker thread
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+        # HEAD pre-check bookkeeping: only keep probing while it pays off
+        self._head_tries = 0
+        self._head_hits = 0
+        self._head_lock = threading.Lock()
+
+    @staticmethod
+    def forget_empty():
+        """
+        Drop the process-wide record of recently empty searches, so an explicit
+        full reprocess searches every ASIN again.
+        """
+        _empty_asins.clear()
+
+    def _etag_shelf(self):
+        """
+        The on-disk metadata cache, or None when it's off for this run: another
+        process (CLI run next to an API / RQ job) has it open, or it failed to
+        open. The dbm backends don't coordinate writers, so we take a lock file
+        first. Call with self._etag_lock held.
+        """
+        if self._etag_cache is None and not self._etag_cache_disabled:
+            path = self._etag_cache_path
+            try:
+                fd = _lock_file(path + ".lock")
+                if fd is None:
+                    logger.warning(
+                        "Metadata cache {} is in use by another process; running without it.", path
+                    )
+                    self._etag_cache_disabled = True
+                else:
+                    try:
+                        self._etag_cache = shelve.open(path)
+                    except Exception:
+                        os.close(fd)
+                        raise
+                    self._etag_cache_fd = fd
+            except Exception as e:
+                logger.warning("Could not open metadata cache {}: {}; running without it.", path, e)
+                self._etag_cache_disabled = True
+        return self._etag_cache
+
+    def close(self):
+        """
+        Flush and close the on-disk metadata cache; the next run reopens it.
+        """
+        with self._etag_lock:
+            if self._etag_cache is not None:
+                self._etag_cache.close()
+                self._etag_cache = None
+            if self._etag_cache_fd is not None:
+                os.close(self._etag_cache_fd)
+                self._etag_cache_fd = None
+            self._etag_cache_disabled = False
+
+    # ---------- RETRIES ----------
+    def _fetch_with_backoff(self, url, max_retries=3, **kwargs):
+        """
+        GET `url` through the session, retrying connection errors / timeouts and
+        429/5xx responses. Honors a numeric Retry-After (capped at 30s); otherwise
+        backs off exponentially. Returns the last response (which may still be
+        non-200); re-raises the last network error if every attempt failed.
+        """
+        for attempt in range(max_retries):
+            self._page_bucket.consume()
+            try:
+                response = self.session.get(url, timeout=15, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == max_retries - 1:
+                    raise
+                time.sleep(_backoff_delay(attempt))
+                continue
+
+            if response.status_code not in _RETRY_STATUSES or attempt == max_retries - 1:
+                return response
+
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = min(float(retry_after), _MAX_RETRY_DELAY)
+            else:
+                delay = _backoff_delay(attempt)
+            logger.warning("{} returned {}, retrying in {:.1f}s", url, response.status_code, delay)
+            time.sleep(delay)
+
+    def _search_with_backoff(self, params, max_retries=3):
+        """
+        Run a SerpAPI search, retrying network errors and rate-limit errors
+        reported in the result body. Other API errors are returned as-is.
+        """
+        for attempt in range(max_retries):
+            self._search_bucket.consume()
+            try:
+                result = GoogleSearch(params).get_dict()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if attempt == max_retries - 1:
+                    raise
+                time.sleep(_backoff_delay(attempt))
+                continue
+
+            error = str(result.get("error", "")).lower()
+            if "rate" not in error or attempt == max_retries - 1:
+                return result
+
+            delay = _backoff_delay(attempt)
+            logger.warning("SerpApi rate limited, retrying in {:.1f}s", delay)
+            time.sleep(delay)
+
     # ---------- PRODUCT METADATA ----------
+    # HEAD pre-checks cost a round trip (and a page token) on a miss, so after
+    # a warm-up sample we stop sending them if fewer than 30% come back unchanged
+    HEAD_WARMUP = 20
+    HEAD_MIN_HIT_RATIO = 0.3
+
+    def _head_check(self, url, etag, last_modified):
+        """
+        Probe a cached product page with HEAD. Returns "unchanged" when the
+        validators still match, "gone" for 404/410, otherwise None (do the GET).
+        """
+        with self._head_lock:
+            if (
+                self._head_tries >= self.HEAD_WARMUP
+                and self._head_hits < self._head_tries * self.HEAD_MIN_HIT_RATIO
+            ):
+                return None
+            self._head_tries += 1
+
+        self._page_bucket.consume()
+        try:
+            head = self.session.head(url, timeout=5, allow_redirects=True)
+        except requests.exceptions.RequestException:
+            return None
+
+        if head.status_code in (404, 410):
+            outcome = "gone"
+        elif head.status_code == 200 and (
+            (etag and head.headers.get("ETag") == etag)
+            or (not etag and last_modified and head.headers.get("Last-Modified") == last_modified)
+        ):
+            outcome = "unchanged"
+        else:
+            return None
+
+        with self._head_lock:
+            self._head_hits += 1
+        return outcome
+
     def get_product_metadata(self, url):
         """
         Fetch metadata (title, price, average rating, total reviews)
         directly from the public Amazon product page HTML.
         We treat this as authoritative product-level info.
         """
-        headers = {
-            "User-Agent": (
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-                "AppleWebKit/537.36 (KHTML, like Gecko) "
-                "Chrome/120.0.0.0 Safari/537.36"
-            ),
-            "Accept-Language": "en-US,en;q=0.9",
-            "Connection": "keep-alive",
-        }
+        memo = self._meta_memo.get(url)
+        if memo is not None:
+            return memo
+
+        with self._etag_lock:
+            shelf = self._etag_shelf()
+            try:
+                cached = shelf.get(url) if shelf is not None else None
+            except Exception as e:
+                logger.warning("Metadata cache read failed for {}: {}", url, e)
+                cached = None
+
+        conditional_headers = {}
+        if cached:
+            etag, last_modified, _ = cached
+
+            # cheap probe first: skips the GET entirely for unchanged / dead pages
+            outcome = self._head_check(url, etag, last_modified)
+            if outcome == "unchanged":
+                logger.debug("HEAD unchanged, using cached metadata for {}", url)
+                self._meta_memo.put(url, cached[2])
+                return cached[2]
+            if outcome == "gone":
+                logger.warning("Product page gone: {}", url)
+                return ProductMetadata.empty()
+
+            if etag:
+                conditional_headers["If-None-Match"] = etag
+            if last_modified:
+                conditional_headers["If-Modified-Since"] = last_modified
 
         try:
-            response = requests.get(url, headers=headers, timeout=15)
+            response = self._fetch_with_backoff(url, headers=conditional_headers)
+            if response.status_code == 304 and cached:
+                logger.debug("Not modified, using cached metadata for {}", url)
+                self._meta_memo.put(url, cached[2])
+                return cached[2]
+
             if response.status_code != 200:
-                print(f"[WARN] Failed to fetch {url} (Status {response.status_code})")
-                return {
-                    "title": None,
-                    "price": None,
-                    "avg_rating": None,
-                    "total_reviews": None,
-                }
+                logger.warning("Failed to fetch {} (Status {})", url, response.status_code)
+                return ProductMetadata.empty()
+
+            # lxml's C parser; raw bytes let it sniff the charset itself
+            doc = lxml_html.fromstring(response.content)
 
-            soup = BeautifulSoup(response.text, "html.parser")
+            found = {}
+            for node in self._XP_FIELDS(doc):
+                found.setdefault(_product_field(node), node)
+                if len(found) == 4:
+                    break
 
             # Product title
-            title_tag = soup.select_one("#productTitle")
-            title_text = title_tag.get_text(strip=True) if title_tag else None
+            title_text = _text(found.get("title"))
 
             # Product price
-            price_tag = soup.select_one(".a-price .a-offscreen, span.a-color-price")
-            price_text = price_tag.get_text(strip=True) if price_tag else None
+            price_text = _text(found.get("price"))
 
             # Average star rating (ex: "4.5 out of 5 stars")
             avg_rating_val = None
-            avg_rating_tag = soup.select_one(
-                "i[data-hook='average-star-rating'] span, span[data-hook='rating-out-of-text']"
-            )
-            if avg_rating_tag:
-                raw = avg_rating_tag.get_text(strip=True)
+            raw = _text(found.get("avg_rating"))
+            if raw:
                 first_token = raw.split(" ")[0]
                 try:
                     avg_rating_val = float(first_token)
@@ -62,33 +480,29 @@ class SerpAPIClient:
 
             # Total number of ratings/reviews (ex: "572 ratings")
             total_reviews_val = None
-            total_reviews_tag = soup.select_one("#acrCustomerReviewText")
-            if total_reviews_tag:
-                raw = total_reviews_tag.get_text(strip=True)
-                first_token = raw.split(" ")[0].replace(",", "")
-                try:
-                    total_reviews_val = int(first_token)
-                except Exception:
-                    total_reviews_val = None
+            raw = _text(found.get("total_reviews"))
+            if raw:
+                m = _COUNT_RE.search(raw)
+                if m:
+                    total_reviews_val = int(m.group(0).replace(",", ""))
+
+            data = ProductMetadata(title_text, price_text, avg_rating_val, total_reviews_val)
 
-            data = {
-                "title": title_text,
-                "price": price_text,
-                "avg_rating": avg_rating_val,
-                "total_reviews": total_reviews_val,
-            }
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            if etag or last_modified:
+                with self._etag_lock:
+                    shelf = self._etag_shelf()
+                    if shelf is not None:
+                        shelf[url] = (etag, last_modified, data)
+            self._meta_memo.put(url, data)
 
-            print(f"[META] Extracted from Amazon: {data}")
+            logger.debug("Extracted from Amazon: {}", data)
             return data
 
         except Exception as e:
-            print(f"[ERROR] Metadata extraction failed for {url}: {e}")
-            return {
-                "title": None,
-                "price": None,
-                "avg_rating": None,
-                "total_reviews": None,
-            }
+            logger.error("Metadata extraction failed for {}: {}", url, e)
+            return ProductMetadata.empty()
 
     # ---------- INDIVIDUAL REVIEWS ----------
     def get_reviews(self, url):
@@ -104,16 +518,62 @@ class SerpAPIClient:
         - leave review_date as None (we don't reliably have it)
         - leave verified = False (we don't reliably have it)
         """
-        asin = None
-        for token in ["/dp/", "/gp/product/", "/product/"]:
-            if token in url:
-                asin = url.split(token)[1].split("/")[0]
-                break
-
+        asin = extract_asin_from_url(url)
         if not asin:
-            print(f"[WARN] Could not extract ASIN from URL: {url}")
+            logger.warning("Could not extract ASIN from URL: {}", url)
             return []
 
+        known = self._known_reviews(asin)
+        if known is not None:
+            return known
+
+        # coalesce concurrent lookups of one ASIN (e.g. two URL forms of the same
+        # product) into a single SerpAPI search; later callers wait on its result
+        with self._inflight_lock:
+            future = self._inflight.get(asin)
+            if future is None:
+                # re-check under the lock: an owner that finished since the check
+                # above has already stored its result and unregistered itself
+                known = self._known_reviews(asin)
+                if known is not None:
+                    return known
+            owner = future is None
+            if owner:
+                future = self._inflight[asin] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            reviews = self._search_reviews(asin)
+            future.set_result(reviews)
+            return reviews
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[asin]
+
+    def _known_reviews(self, asin):
+        """
+        Snippets for `asin` we already have (memo, or a recent empty search),
+        or None if a search is needed.
+        """
+        memo = self._reviews_memo.get(asin)
+        if memo is not None:
+            return memo
+
+        seen_empty = _empty_asins.get(asin)
+        if seen_empty is not None and time.monotonic() - seen_empty < _EMPTY_RESULTS_TTL:
+            logger.debug("Skipping {}: no review snippets found within the last hour.", asin)
+            return []
+        return None
+
+    def _search_reviews(self, asin):
+        """
+        One SerpAPI search for `asin`, parsed into ReviewSnippet rows.
+        Errors are logged and come back as an empty list.
+        """
         params = {
             "engine": "google",
             "q": f"site:amazon.com {asin} customer reviews",
@@ -121,11 +581,13 @@ class SerpAPIClient:
         }
 
         try:
-            search = GoogleSearch(params)
-            result = search.get_dict()
+            result = self._search_with_backoff(params)
 
-            if "error" in result:
-                print(f"[WARN] SerpApi error: {result['error']}")
+            # "no results" comes back as an error too; it's an empty answer (cached
+            # below), unlike bad key / quota / rate-limit errors
+            error = result.get("error")
+            if error and _NO_RESULTS_ERROR not in str(error):
+                logger.warning("SerpApi error: {}", error)
                 return []
 
             reviews = []
@@ -135,33 +597,23 @@ class SerpAPIClient:
                     continue
 
                 # Try naive "X star" detection in snippet
-                rating_guess = None
-                text_lower = snippet.lower()
-                for star in range(5, 0, -1):
-                    # match "5 star", "5 stars", "5-star"
-                    if (
-                        f"{star} star" in text_lower
-                        or f"{star}-star" in text_lower
-                        or f"{star} stars" in text_lower
-                    ):
-                        rating_guess = star
-                        break
+                m = _STAR_RE.search(snippet)
+                rating_guess = int(m.group("n")) if m else None
 
                 reviews.append(
-                    {
-                        "review_title": item.get("title"),
-                        "review_text": snippet,
-                        "rating": rating_guess,      # individual review rating (may be None)
-                        "review_date": None,         # we can't reliably scrape this via SerpAPI Google
-                        "verified": False,           # also unknown here
-                    }
+                    ReviewSnippet(item.get("title"), snippet, rating_guess, None, False)
                 )
 
-            print(f"[REVIEWS] Extracted {len(reviews)} review snippets for {asin}.")
-            # throttle so we don't hammer SerpAPI/free tier
-            time.sleep(1)
+            if not reviews:
+                _empty_asins[asin] = time.monotonic()
+                logger.info("No review snippets found for {}.", asin)
+                return []
+
+            _empty_asins.pop(asin, None)
+            self._reviews_memo.put(asin, reviews)
+            logger.info("Extracted {} review snippets for {}.", len(reviews), asin)
             return reviews
 
         except Exception as e:
-            print(f"[ERROR] Failed to fetch reviews via SerpApi: {e}")
+            logger.error("Failed to fetch reviews via SerpApi: {}", e)
             return []
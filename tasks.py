@@ -0,0 +1,43 @@
+import os
+import threading
+from loguru import logger
+from etl_runner import ETLPipeline
+
+
+def run_etl_pipeline(skip_existing=True):
+    """
+    Job body: run the ETL and record the outcome in etl_status.
+    Runs either inside an RQ worker process or on a local background thread.
+    """
+    pipeline = ETLPipeline()
+    db = pipeline.db  # reuse the pipeline's manager rather than building a second one
+    db.set_processing_status("Processing started...")
+    try:
+        pipeline.run(skip_existing=skip_existing)
+        db.set_processing_status("Processing completed successfully", is_processing=False)
+    except Exception as e:
+        logger.error(f"ETL job failed: {e}")
+        db.set_processing_status(f"Error: {str(e)}", is_processing=False)
+
+
+def enqueue_etl(skip_existing=True):
+    """
+    Hand the ETL job off to the "etl" RQ queue when REDIS_URL is configured
+    (start a worker with `rq worker etl`), so it survives API restarts and
+    doesn't run inside a web worker. Without Redis we fall back to a daemon
+    thread in this process, which is fine for the single-process dev server.
+
+    Returns the RQ job id, or None for the thread fallback.
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        from redis import Redis
+        from rq import Queue
+
+        queue = Queue("etl", connection=Redis.from_url(redis_url))
+        job = queue.enqueue(run_etl_pipeline, skip_existing, job_timeout=-1)
+        return job.id
+
+    t = threading.Thread(target=run_etl_pipeline, args=(skip_existing,), daemon=True)
+    t.start()
+    return None